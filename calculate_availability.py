@@ -1,13 +1,31 @@
 import pandas as pd
 import numpy as np
-from openpyxl import load_workbook
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill
 import argparse
 import logging
-from fetch_data import fetch_plant_data, fetch_inverter_data, fetch_mppt_data, fetch_string_data, get_plant_names
+import threading
+from pymongo import MongoClient
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from numba import get_num_threads, get_thread_id, njit, prange
+except ImportError:  # numba is optional; group sums fall back to np.bincount
+    njit = None
+from fetch_data import iter_plant_data, iter_inverter_data, iter_mppt_data, iter_string_data, get_plant_names, date_bounds, CHUNK_SIZE
 
 logging.basicConfig(level=logging.INFO)
 
+# One shared fill per availability color, built on first use; 'FF' alpha prefix keeps fills opaque (ARGB).
+_FILL_CACHE = {}
+
+def _fill(color):
+    """Cached solid PatternFill for a hex color."""
+    fill = _FILL_CACHE.get(color)
+    if fill is None:
+        fill = _FILL_CACHE[color] = PatternFill(start_color=f"FF{color}", end_color=f"FF{color}", fill_type="solid")
+    return fill
+
 def get_availability_color(value):
     """Color based on availability %."""
     if pd.isna(value) or value == "Data Unavailable":
@@ -25,93 +43,269 @@ def get_availability_color(value):
         return "FF0000"
     return "FFFFFF"
 
+def get_availability_colors(values):
+    """Vectorized get_availability_color over a sequence of availability values."""
+    vals = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=float)
+    # Buckets: <80, [80,95), [95,98), [98,100), >=100 (only exactly 100 is green)
+    palette = np.array(["FF0000", "FFA500", "FFFF00", "0000FF", "FFFFFF"])
+    colors = palette[np.digitize(vals, [80, 95, 98, 100])]
+    colors[vals == 100] = "00FF00"
+    colors[np.isnan(vals)] = "808080"
+    return colors
+
 def apply_coloring(excel_file, col_name='Availability'):
     """Apply colors to Excel column."""
     try:
         wb = load_workbook(excel_file)
         ws = wb.active
-        df = pd.read_excel(excel_file)
-        col_idx = df.columns.get_loc(col_name) + 1
-        for row in range(2, ws.max_row + 1):
-            cell = ws.cell(row=row, column=col_idx)
-            color = get_availability_color(cell.value)
-            cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
+        headers = [cell.value for cell in ws[1]]
+        col_idx = headers.index(col_name) + 1
+        cells = [cell for (cell,) in ws.iter_rows(min_row=2, max_row=ws.max_row, min_col=col_idx, max_col=col_idx)]
+        for cell, color in zip(cells, get_availability_colors([cell.value for cell in cells])):
+            cell.fill = _fill(color)
         wb.save(excel_file)
         logging.info(f"Saved colored Excel: {excel_file}")
     except Exception as e:
         logging.error(f"Error coloring {excel_file}: {e}")
 
 
-def calculate_availability(df, level, formula='A', irradiance_threshold=0.05, power_threshold=0.0):
-    """Core availability calc for any level with customizable power threshold."""
-    if df.empty:
-        return pd.DataFrame(), pd.DataFrame()
-
-    df = df.copy()
-    # Select power and radiation columns based on level
+def fast_to_excel(df, excel_file, col_name='Availability'):
+    """Stream df into a write-only workbook, coloring col_name as rows are appended."""
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(list(df.columns))
+    col_idx = df.columns.get_loc(col_name) if col_name in df.columns else None
+    colors = get_availability_colors(df[col_name]) if col_idx is not None else None
+    for i, row in enumerate(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)):
+        cells = list(row)
+        if col_idx is not None:
+            cell = WriteOnlyCell(ws, value=row[col_idx])
+            cell.fill = _fill(colors[i])
+            cells[col_idx] = cell
+        ws.append(cells)
+    wb.save(excel_file)
+    logging.info(f"Saved colored Excel: {excel_file}")
+
+
+def availability_percentage(numerator, denominator, valid_points):
+    """Vectorized availability % per row; 'Data Unavailable' where no valid radiation points exist."""
+    num = np.asarray(numerator, dtype=float)
+    den = np.asarray(denominator, dtype=float)
+    # Zero denominator (no irradiance above threshold) counts as 0%, not missing data.
+    avail = np.round(np.divide(num, den, out=np.zeros_like(num), where=den > 0) * 100, 2)
+    result = pd.Series(avail, index=getattr(numerator, 'index', None), dtype=object)
+    return result.where(np.asarray(valid_points) > 0, 'Data Unavailable')
+
+
+SUM_COLS = ['Num', 'Den', 'Act_Wt', 'Pot_Wt', 'ValidRadPoints']
+# Same sums with raw radiation read as kW/m²; see partial_availability
+KW_SUM_COLS = [f'{c}_kW' for c in SUM_COLS]
+
+# Thread-local buckets in the parallel kernel cost threads x groups x 5 floats; above this go serial
+PARALLEL_MAX_CELLS = 1 << 24
+
+if njit is not None:
+    @njit(inline='always')
+    def _accumulate(out, g, r, p, irr_t, pwr_t):
+        """Mask + accumulate one row into out[g]; columns follow SUM_COLS. NaN fails every comparison."""
+        if g < 0 or np.isnan(r):
+            return
+        out[g, 4] += 1
+        if r > irr_t:
+            out[g, 1] += 1
+            out[g, 3] += r
+            if p > pwr_t:
+                out[g, 0] += 1
+                out[g, 2] += r
+
+    @njit(cache=True)
+    def _availability_sums(codes, rad, pwr, irr_t, pwr_t, n_groups):
+        out = np.zeros((n_groups, 5))
+        for i in range(codes.size):
+            _accumulate(out, codes[i], rad[i], pwr[i], irr_t, pwr_t)
+        return out
+
+    @njit(parallel=True)
+    def _availability_sums_parallel(codes, rad, pwr, irr_t, pwr_t, n_groups):
+        local = np.zeros((get_num_threads(), n_groups, 5))
+        for i in prange(codes.size):
+            _accumulate(local[get_thread_id()], codes[i], rad[i], pwr[i], irr_t, pwr_t)
+        return local.sum(axis=0)
+
+    # Start numba's threading layer on the importing (main) thread: TBB first started from one of the
+    # per-plant worker threads keeps the process from exiting
+    _NUM_THREADS = get_num_threads()
+    # The per-plant workers take turns in the parallel kernel; the workqueue layer aborts on concurrent calls
+    _PARALLEL_LOCK = threading.Lock()
+
+
+def factorize_groups(df, group_cols):
+    """Integer group id per row and the matching key frame; rows with a missing key get -1, as groupby drops them."""
+    col_codes, col_uniques = [], []
+    for c in group_cols:
+        codes, uniques = pd.factorize(df[c])
+        col_codes.append(codes)
+        col_uniques.append(uniques)
+    valid = np.logical_and.reduce([codes >= 0 for codes in col_codes])
+    dims = tuple(max(len(u), 1) for u in col_uniques)
+    compound = np.ravel_multi_index(tuple(codes[valid] for codes in col_codes), dims)
+    group_ids = np.full(len(df), -1, dtype=np.int64)
+    group_ids[valid], uniq_compound = pd.factorize(compound)
+    key_idx = np.unravel_index(uniq_compound, dims)
+    keys = pd.DataFrame({c: u.take(idx) for c, u, idx in zip(group_cols, col_uniques, key_idx)})
+    return group_ids, keys
+
+
+def availability_sums(group_ids, keys, rad, pwr, irradiance_threshold, power_threshold):
+    """Per-group SUM_COLS from radiation/power arrays, for group ids and keys from factorize_groups.
+
+    With numba the masks and sums are fused into one pass (parallel, one caller at a time, when the
+    thread-local buckets fit); otherwise np.bincount is used.
+    """
+    n_groups = len(keys)
+    irr_t = float(irradiance_threshold)
+    if njit is not None:
+        if 1 < _NUM_THREADS and _NUM_THREADS * n_groups * 5 <= PARALLEL_MAX_CELLS:
+            with _PARALLEL_LOCK:
+                sums = _availability_sums_parallel(group_ids, rad, pwr, irr_t, float(power_threshold), n_groups)
+        else:
+            sums = _availability_sums(group_ids, rad, pwr, irr_t, float(power_threshold), n_groups)
+        daily = keys.assign(**{c: sums[:, j] for j, c in enumerate(SUM_COLS)})
+    else:
+        rad_ok = rad > irr_t
+        both_ok = rad_ok & (pwr > power_threshold)
+        weights = [both_ok, rad_ok, np.where(both_ok, rad, 0.0), np.where(rad_ok, rad, 0.0), ~np.isnan(rad)]
+        # Shift ids by one so rows with a missing key (-1) land in a discarded bucket 0
+        daily = keys.assign(**{c: np.bincount(group_ids + 1, weights=w, minlength=n_groups + 1)[1:]
+                               for c, w in zip(SUM_COLS, weights)})
+    daily[['Num', 'Den', 'ValidRadPoints']] = daily[['Num', 'Den', 'ValidRadPoints']].astype(np.int64)
+    return daily
+
+
+def _level_columns(level):
+    """Power column, radiation column and ID columns used at a given level."""
     power_col = ('dataItemMap.inverter_power' if level == 'plant' else
                  'InverterPower' if level == 'inverter' else
                  'mppt_Power' if level == 'mppt' else
                  'P_abd')
     rad_col = 'dataItemMap.radiation_intensity' if level == 'plant' else 'radiation_intensity'
+    id_cols = (['sn'] if level == 'inverter' else
+               ['sn', 'mpptId'] if level == 'mppt' else
+               ['sn', 'MPPT', 'Strings'] if level == 'string' else
+               [])
+    return power_col, rad_col, id_cols
 
-    id_col = ('sn' if level == 'inverter' else
-              ['sn', 'mpptId'] if level == 'mppt' else
-              ['sn', 'MPPT', 'Strings'] if level == 'string' else
-              None)
 
-    df['timestamp'] = pd.to_datetime(df.get('timestamp', df.get('Day_Hour')), errors='coerce')
-    df['Date'] = df['timestamp'].dt.date
+def _prepare_rows(df, level):
+    """Filter df for level and read it as (work, group_cols, rad, pwr); None if required columns are missing.
 
+    No copy of df: work holds only timestamp, Date and the group keys, while radiation
+    and power are plain float arrays in their raw units.
+    """
+    power_col, rad_col, id_cols = _level_columns(level)
     if level == 'string':
         df = df[df['String_Configured'] == 1]
 
     if power_col not in df.columns or rad_col not in df.columns:
         logging.error(f"Missing required columns: {power_col} or {rad_col}")
-        return pd.DataFrame(), pd.DataFrame()
-
-    # --- Convert radiation intensity kW/m² → W/m² if needed ---
-    if df[rad_col].max(skipna=True) <= 5:
+        return None
+
+    timestamp = pd.to_datetime(df.get('timestamp', df.get('Day_Hour')), errors='coerce')
+    key_cols = [c for c in id_cols + ['Plant'] if c in df.columns]
+    work = pd.DataFrame({
+        'timestamp': timestamp.to_numpy(),
+        # Stay datetime64 for grouping; converted to date only on the (small) daily frame
+        'Date': timestamp.dt.floor('D').to_numpy(),
+        # Plain key columns: factorize_groups hashes them once, so a category cast would be a second pass
+        **{c: df[c].array for c in key_cols},
+    })
+    return work, ['Date'] + key_cols, df[rad_col].to_numpy(dtype=float), df[power_col].to_numpy(dtype=float)
+
+
+def _kw_threshold(irradiance_threshold):
+    """Threshold to apply to raw kW/m² readings: scaling both sides by 1000 leaves a kW/m² threshold as is."""
+    return irradiance_threshold if irradiance_threshold < 5 else irradiance_threshold / 1000
+
+
+def _kw_mask(plants, rad_max, n):
+    """True where a row's plant reports radiation in kW/m² (its max reading is <= 5)."""
+    in_kw = {plant: bool(max_rad <= 5) for plant, max_rad in rad_max.items()}
+    if plants is None:
+        return np.full(n, in_kw.get(None, False))
+    return np.asarray(pd.Series(plants).map(in_kw), dtype=bool)
+
+
+def _partial_from_rows(work, group_cols, rad, pwr, irradiance_threshold, power_threshold):
+    # Factorize once; both threshold passes reuse the same group ids and keys
+    group_ids, keys = factorize_groups(work, group_cols)
+    sums = availability_sums(group_ids, keys, rad, pwr, irradiance_threshold, power_threshold)
+    kw_threshold = _kw_threshold(irradiance_threshold)
+    kw_sums = sums if kw_threshold == irradiance_threshold else availability_sums(
+        group_ids, keys, rad, pwr, kw_threshold, power_threshold)
+    for c, kw_c in zip(SUM_COLS, KW_SUM_COLS):
+        sums[kw_c] = kw_sums[c].to_numpy()
+    rad_series = pd.Series(rad)
+    if 'Plant' in work.columns:
+        rad_max = rad_series.groupby(work['Plant'], sort=False, observed=True).max().to_dict()
+    else:
+        rad_max = {None: rad_series.max(skipna=True)}
+    return sums, rad_max
+
+
+def partial_availability(df, level, irradiance_threshold=0.05, power_threshold=0.0):
+    """Per-group sums for one chunk of raw rows, to be combined with merge_partials and finished by finalize_availability.
+
+    Returns (sums, rad_max) or None. The kW/m² vs W/m² decision needs a plant's max over all of its
+    rows, so sums keeps SUM_COLS for a W/m² reading and KW_SUM_COLS for a kW/m² reading (in raw
+    units), and rad_max the running max radiation per plant; the unit is picked at finalize time.
+    """
+    rows = _prepare_rows(df, level)
+    if rows is None:
+        return None
+    return _partial_from_rows(*rows, irradiance_threshold, power_threshold)
+
+
+def merge_partials(*partials):
+    """Combine partial_availability results (None entries are skipped) in one pass over their group rows."""
+    partials = [p for p in partials if p is not None]
+    if len(partials) < 2:
+        return partials[0] if partials else None
+    sums = pd.concat([p[0] for p in partials], ignore_index=True)
+    group_cols = [c for c in sums.columns if c not in SUM_COLS + KW_SUM_COLS]
+    group_ids, keys = factorize_groups(sums, group_cols)
+    merged = keys.assign(**{c: np.bincount(group_ids, weights=sums[c].to_numpy(dtype=float), minlength=len(keys))
+                            for c in SUM_COLS + KW_SUM_COLS})
+    count_cols = ['Num', 'Den', 'ValidRadPoints']
+    count_cols += [f'{c}_kW' for c in count_cols]
+    merged[count_cols] = merged[count_cols].astype(np.int64)
+    rad_max = dict(partials[0][1])
+    for p in partials[1:]:
+        for plant, max_rad in p[1].items():
+            rad_max[plant] = np.fmax(rad_max.get(plant, np.nan), max_rad)
+    return merged, rad_max
+
+
+def finalize_availability(partial, level, formula='A'):
+    """Turn accumulated partial sums into the daily availability frame for level and formula."""
+    if partial is None:
+        return pd.DataFrame()
+    sums, rad_max = partial
+    _, rad_col, _ = _level_columns(level)
+    group_cols = [c for c in sums.columns if c not in SUM_COLS + KW_SUM_COLS]
+
+    # --- Convert radiation intensity kW/m² → W/m² if needed (decided per plant) ---
+    in_kw = _kw_mask(sums['Plant'] if 'Plant' in sums.columns else None, rad_max, len(sums))
+    if in_kw.any():
         logging.info(f"Converting {rad_col} from kW/m² → W/m²")
-        df[rad_col] = df[rad_col] * 1000
-        if irradiance_threshold < 5:
-            irradiance_threshold = irradiance_threshold * 1000
-            logging.info(f"Updated irradiance_threshold → {irradiance_threshold} W/m²")
-
-    # Use power_threshold instead of hardcoded power > 0
-    df['Num'] = ((df[rad_col] > irradiance_threshold) & (df[power_col] > power_threshold)).astype(int)
-    df['Den'] = (df[rad_col] > irradiance_threshold).astype(int)
-    df['Act_Wt'] = np.where((df[rad_col] > irradiance_threshold) & (df[power_col] > power_threshold), df[rad_col], 0)
-    df['Pot_Wt'] = np.where(df[rad_col] > irradiance_threshold, df[rad_col], 0)
-
-    # --- NEW: Count valid (non-null) radiation data points ---
-    df['ValidRadPoints'] = (~df[rad_col].isnull()).astype(int)
-
-    group_cols = ['Date']
-    if id_col:
-        if isinstance(id_col, list):
-            group_cols.extend(id_col)
-        else:
-            group_cols.append(id_col)
-    if 'Plant' in df.columns:
-        group_cols.append('Plant')
-
-    daily = df.groupby(group_cols).agg({
-        'Num': 'sum',
-        'Den': 'sum',
-        'Act_Wt': 'sum',
-        'Pot_Wt': 'sum',
-        'ValidRadPoints': 'sum' # --- NEW: Aggregate the count of valid radiation data points
-    }).reset_index()
+    daily = sums[group_cols].copy()
+    for c, kw_c in zip(SUM_COLS, KW_SUM_COLS):
+        daily[c] = np.where(in_kw, sums[kw_c], sums[c])
+    for c in ('Act_Wt', 'Pot_Wt'):
+        daily[c] = daily[c] * np.where(in_kw, 1000, 1)
+    daily['Date'] = daily['Date'].dt.date
 
     if formula == 'A':
-        daily['Availability'] = np.where(
-            # Condition for "Data Unavailable": No valid radiation points found.
-            daily['ValidRadPoints'] == 0,
-            'Data Unavailable',
-            # For all other cases, calculate the availability. This handles both 0% and >0% cases.
-            np.round((daily['Num'] / daily['Den'].replace(0, np.nan)) * 100, 2).fillna(0)
-        )
+        daily['Availability'] = availability_percentage(daily['Num'], daily['Den'], daily['ValidRadPoints'])
         if level == 'mppt':
             daily = daily[['Date', 'Plant', 'sn', 'mpptId', 'Num', 'Den', 'Availability']]
         elif level == 'string':
@@ -119,27 +313,120 @@ def calculate_availability(df, level, formula='A', irradiance_threshold=0.05, po
         else:
             daily = daily[group_cols + ['Num', 'Den', 'Availability']]
     else:  # Formula B
-        daily['Availability'] = np.where(
-            # Condition for "Data Unavailable": No valid radiation points found.
-            daily['ValidRadPoints'] == 0,
-            'Data Unavailable',
-            # For all other cases, calculate the availability.
-            np.round((daily['Act_Wt'] / daily['Pot_Wt'].replace(0, np.nan)) * 100, 2).fillna(0)
-        )
+        daily['Availability'] = availability_percentage(daily['Act_Wt'], daily['Pot_Wt'], daily['ValidRadPoints'])
         if level == 'mppt':
             daily = daily[['Date', 'Plant', 'sn', 'mpptId', 'Act_Wt', 'Pot_Wt', 'Availability']]
         elif level == 'string':
             daily = daily[['Date', 'Plant', 'sn', 'MPPT', 'Strings', 'Act_Wt', 'Pot_Wt', 'Availability']]
         else:
             daily = daily[group_cols + ['Act_Wt', 'Pot_Wt', 'Availability']]
+    return daily
+
+
+def calculate_availability(df, level, formula='A', irradiance_threshold=0.05, power_threshold=0.0,
+                           return_debug=False):
+    """Core availability calc for any level; per-row debug_df is only built when return_debug is set."""
+    empty_debug = pd.DataFrame() if return_debug else None
+    if df.empty:
+        return pd.DataFrame(), empty_debug
+
+    rows = _prepare_rows(df, level)
+    if rows is None:
+        return pd.DataFrame(), empty_debug
+    work, group_cols, rad, pwr = rows
+    partial = _partial_from_rows(work, group_cols, rad, pwr, irradiance_threshold, power_threshold)
+    daily = finalize_availability(partial, level, formula)
+    if not return_debug:
+        return daily, None
+
+    # Per-row conditions for debug_df, in W/m²; build each mask once, use power_threshold instead of power > 0
+    power_col, rad_col, _ = _level_columns(level)
+    in_kw = _kw_mask(work['Plant'] if 'Plant' in work.columns else None, partial[1], len(work))
+    rad = np.where(in_kw, rad * 1000, rad)
+    threshold = irradiance_threshold
+    if in_kw.any() and irradiance_threshold < 5:
+        threshold = np.where(in_kw, irradiance_threshold * 1000, irradiance_threshold)
+    rad_ok = rad > threshold
+    both_ok = rad_ok & (pwr > power_threshold)
+    work[power_col] = pwr
+    work[rad_col] = rad
+    work['Num'] = both_ok.view(np.int8)
+    work['Den'] = rad_ok.view(np.int8)
+    work['Act_Wt'] = np.where(both_ok, rad, 0.0)
+    work['Pot_Wt'] = np.where(rad_ok, rad, 0.0)
 
     # Retain the original debug_df for debugging purposes if needed
-    debug_df = df[
-        ['Plant', 'timestamp', power_col, rad_col, 'Num', 'Den', 'Act_Wt', 'Pot_Wt']] if 'Plant' in df.columns else df[
+    debug_df = work[
+        ['Plant', 'timestamp', power_col, rad_col, 'Num', 'Den', 'Act_Wt', 'Pot_Wt']] if 'Plant' in work.columns else work[
         ['timestamp', power_col, rad_col, 'Num', 'Den', 'Act_Wt', 'Pot_Wt']]
     return daily, debug_df
 
 
+NUMERIC_COLS = ['dataItemMap.inverter_power', 'dataItemMap.radiation_intensity', 'InverterPower', 'radiation_intensity', 'mppt_Power', 'P_abd']
+
+
+def iter_level_data(args, plant, client=None):
+    """Stream one plant's raw data for args.level in chunks, with Plant set and numerics cleaned."""
+    plant_display = plant.replace('_', ' ')
+    power_col, rad_col, id_cols = _level_columns(args.level)
+    # Only the columns the availability calc reads, flattened by MongoDB instead of flatten_json
+    fields = (['Day_Hour', power_col, rad_col, 'String_Configured'] if args.level == 'string' else
+              ['timestamp', power_col, rad_col]) + id_cols
+    if args.level == 'plant':
+        chunks = iter_plant_data(args.connection_string, plant, args.start_date, args.end_date, args.chunk_size, fields, client)
+    elif args.level == 'inverter':
+        chunks = iter_inverter_data(args.connection_string, plant, args.inverter_sn, args.start_date, args.end_date, args.chunk_size, fields, client)
+    elif args.level == 'mppt':
+        chunks = iter_mppt_data(args.connection_string, plant, args.inverter_sn, args.mppt_id, args.start_date, args.end_date, args.chunk_size, client)
+    elif args.level == 'string':
+        chunks = iter_string_data(args.connection_string, plant, args.inverter_sn, args.mppt_id, args.string_id, args.start_date, args.end_date, args.chunk_size, fields, client)
+    else:
+        chunks = iter(())
+
+    for df in chunks:
+        if 'Plant' not in df.columns:
+            df['Plant'] = plant_display
+        # Clean numerics; BSON doubles arrive numeric already, so only other columns go through to_numeric.
+        # Kept float64: float32 moves readings like 0.05 across the irradiance threshold.
+        for col in NUMERIC_COLS:
+            if col in df.columns:
+                values = df[col]
+                if not pd.api.types.is_numeric_dtype(values):
+                    values = pd.to_numeric(values, errors='coerce')
+                df[col] = values.to_numpy(dtype=float)
+        yield df
+
+
+# Chunk partials buffered before folding them into a plant's running sums
+MERGE_EVERY = 16
+
+
+def accumulate_level_data(args, plant, client=None):
+    """Fold one plant's chunks into availability partial sums, so only O(groups) state stays resident."""
+    plant_display = plant.replace('_', ' ')
+    logging.info(f"Processing plant: {plant_display}")
+    partial = None
+    pending = []
+    found = False
+    try:
+        for df in iter_level_data(args, plant, client):
+            found = True
+            pending.append(partial_availability(df, args.level, args.irradiance_threshold, args.power_threshold))
+            # Fold chunk partials into the running sums in batches, so the accumulated groups are re-merged
+            # once per MERGE_EVERY chunks rather than once per chunk
+            if len(pending) >= MERGE_EVERY:
+                partial = merge_partials(partial, *pending)
+                pending = []
+        partial = merge_partials(partial, *pending)
+    except Exception as e:
+        # A fetch that fails part way would under-count the plant's availability, so drop the plant instead
+        logging.error(f"Error fetching {args.level} data for {plant_display}; plant skipped: {e}")
+        return None
+    if not found:
+        logging.warning(f"No data for {plant_display} at {args.level} level.")
+    return partial
+
+
 def main():
     parser = argparse.ArgumentParser(description="Calculate solar availability.")
     parser.add_argument('--level', required=True, choices=['plant', 'inverter', 'mppt', 'string'])
@@ -154,6 +441,8 @@ def main():
     parser.add_argument('--irradiance_threshold', type=float, default=0.05)
     parser.add_argument('--power_threshold', type=float, default=0.0, help="Power threshold for availability calculation (default: 0.0)")
     parser.add_argument('--output_excel', default=None, help="Output Excel file (default: {plant}_{level}_{formula}_availability.xlsx)")
+    parser.add_argument('--workers', type=int, default=8, help="Number of plants fetched concurrently (default: 8)")
+    parser.add_argument('--chunk_size', type=int, default=CHUNK_SIZE, help=f"Rows fetched and aggregated per chunk (default: {CHUNK_SIZE})")
 
     args = parser.parse_args()
 
@@ -169,53 +458,33 @@ def main():
 
     logging.info(f"Starting calc for {args.level} | Plant(s): {args.plant_name} | Inverter(s): {args.inverter_sn} | MPPT(s): {args.mppt_id} | String(s): {args.string_id} | Formula: {args.formula} | Irradiance Threshold: {args.irradiance_threshold} | Power Threshold: {args.power_threshold} | Output: {args.output_excel}")
 
-    if args.plant_name.lower() == 'all':
-        plants = get_plant_names(args.connection_string)
-    else:
-        plants = [p.strip().replace(' ', '_') for p in args.plant_name.split(',')]
-
-    if not plants:
-        logging.error("No plants found.")
-        return
-
-    all_dfs = []
-    for plant in plants:
-        plant_display = plant.replace('_', ' ')
-        logging.info(f"Processing plant: {plant_display}")
-
-        if args.level == 'plant':
-            df = fetch_plant_data(args.connection_string, plant, args.start_date, args.end_date)
-        elif args.level == 'inverter':
-            df = fetch_inverter_data(args.connection_string, plant, args.inverter_sn, args.start_date, args.end_date)
-        elif args.level == 'mppt':
-            df = fetch_mppt_data(args.connection_string, plant, args.inverter_sn, args.mppt_id, args.start_date, args.end_date)
-        elif args.level == 'string':
-            df = fetch_string_data(args.connection_string, plant, args.inverter_sn, args.mppt_id, args.string_id, args.start_date, args.end_date)
-        else:
-            df = pd.DataFrame()
+    # Parse the date range once for every plant's fetch instead of per call
+    if args.start_date and args.end_date:
+        args.start_date, args.end_date = date_bounds(args.start_date, args.end_date)
 
-        if df.empty:
-            logging.warning(f"No data for {plant_display} at {args.level} level.")
-            continue
+    # One client (and connection pool) for the whole run, shared by every plant's fetch
+    client = MongoClient(args.connection_string, maxPoolSize=32)
+    try:
+        if args.plant_name.lower() == 'all':
+            plants = get_plant_names(args.connection_string, client)
+        else:
+            plants = [p.strip().replace(' ', '_') for p in args.plant_name.split(',')]
 
-        # Clean numerics
-        numeric_cols = ['dataItemMap.inverter_power', 'dataItemMap.radiation_intensity', 'InverterPower', 'radiation_intensity', 'mppt_Power', 'P_abd']
-        for col in numeric_cols:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+        if not plants:
+            logging.error("No plants found.")
+            return
 
-        daily, debug = calculate_availability(df, args.level, args.formula, args.irradiance_threshold, args.power_threshold)
-        if 'Plant' not in daily.columns:
-            daily.insert(0, 'Plant', plant_display)
-        all_dfs.append(daily)
+        # Fetch plants concurrently (Mongo I/O releases the GIL); map() keeps results in plant order
+        with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(plants)))) as executor:
+            partials = list(executor.map(lambda plant: accumulate_level_data(args, plant, client), plants))
+    finally:
+        client.close()
 
-        # Optional debug CSV
-        # debug.to_csv(f"debug_{plant}_{args.level}.csv", index=False)
+    partial = merge_partials(*partials)
+    final_df = finalize_availability(partial, args.level, args.formula)
 
-    if all_dfs:
-        final_df = pd.concat(all_dfs, ignore_index=True)
-        final_df.to_excel(args.output_excel, index=False)
-        apply_coloring(args.output_excel)
+    if not final_df.empty:
+        fast_to_excel(final_df, args.output_excel)
         logging.info(f"Results saved to {args.output_excel}")
         print(final_df.head())
     else:
@@ -0,0 +1,64 @@
+from pymongo import ASCENDING, MongoClient
+import argparse
+import logging
+from fetch_data import get_plant_names
+
+logging.basicConfig(level=logging.INFO)
+
+# Indexes per collection, matching the filters the fetch_data queries send.
+# Equality fields go before the range field, except where the equality filters are optional ('all' by default).
+PLANT_INDEXES = {
+    'HR_PL_PRD': [
+        [('timestamp', ASCENDING)],
+    ],
+    'HR_IL_PRD_IN': [
+        # sn/MPPT/Strings are usually 'all', so Day_Hour leads and the rest are filtered within the index
+        [('Day_Hour', ASCENDING), ('sn', ASCENDING), ('MPPT', ASCENDING), ('Strings', ASCENDING)],
+    ],
+}
+ADMIN_INDEXES = {
+    'ALL_HR_ILMP_PRD_AVAIL': [
+        # Inverter and MPPT levels: Plant is always set, sn is optional
+        [('Plant', ASCENDING), ('timestamp', ASCENDING), ('sn', ASCENDING)],
+    ],
+}
+
+def _create_indexes(db, indexes):
+    """Create each index on db; create_index is a no-op when an identical index exists."""
+    for collection_name, keys_list in indexes.items():
+        for keys in keys_list:
+            try:
+                name = db[collection_name].create_index(keys)
+                logging.info(f"Index {name} ready on {db.name}.{collection_name}.")
+            except Exception as e:
+                logging.error(f"Error creating index {keys} on {db.name}.{collection_name}: {e}")
+
+def ensure_indexes(connection_string, plant_name='all', client=None):
+    """
+    Create the indexes the fetch queries rely on (idempotent).
+    - shams_admin: ALL_HR_ILMP_PRD_AVAIL
+    - shams_{plant_name} (or all valid shams_* if 'all'): HR_PL_PRD, HR_IL_PRD_IN
+    - client: existing MongoClient to use (left open); otherwise one is opened for this call.
+    """
+    own_client = client is None
+    try:
+        if own_client:
+            client = MongoClient(connection_string)
+        if plant_name.lower() == 'all':
+            plants = get_plant_names(connection_string, client)
+        else:
+            plants = [p.strip().replace(' ', '_') for p in plant_name.split(',')]
+        _create_indexes(client['shams_admin'], ADMIN_INDEXES)
+        for plant in plants:
+            _create_indexes(client[f"shams_{plant}"], PLANT_INDEXES)
+    finally:
+        if own_client and client is not None:
+            client.close()
+
+if __name__ == '__main__':
+    # One-shot: python ensure_indexes.py --plant_name all
+    parser = argparse.ArgumentParser(description="Create the MongoDB indexes used by the availability fetches.")
+    parser.add_argument('--plant_name', default='all', help="Plant name, 'all', or comma-separated list")
+    parser.add_argument('--connection_string', default='mongodb://110.39.23.106:27023/')
+    args = parser.parse_args()
+    ensure_indexes(args.connection_string, args.plant_name)
@@ -1,100 +1,312 @@
 import pandas as pd
 from pymongo import MongoClient
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import time
 
 logging.basicConfig(level=logging.INFO)
 
 def flatten_json(data, parent_key='', sep='.'):
     """Flatten nested JSON/dict, handling lists and dicts."""
     items = {}
-    for key, value in data.items():
-        new_key = f"{parent_key}{sep}{key}" if parent_key else key
-        if isinstance(value, dict):
-            items.update(flatten_json(value, new_key, sep))
-        elif isinstance(value, list):
-            for i, item in enumerate(value):
-                items.update(flatten_json({f"{new_key}[{i}]": item}, '', sep))
-        else:
+    # Explicit stack of (key prefix, is_list, iterator) instead of recursion; scalars are written as they are seen
+    stack = [(parent_key, False, iter(data.items()))]
+    while stack:
+        prefix, is_list, it = stack[-1]
+        for key, value in it:
+            if is_list:
+                new_key = f"{prefix}[{key}]"
+            else:
+                new_key = f"{prefix}{sep}{key}" if prefix else key
+            if isinstance(value, dict):
+                stack.append((new_key, False, iter(value.items())))
+                break
+            elif isinstance(value, list):
+                stack.append((new_key, True, enumerate(value)))
+                break
             items[new_key] = value
+        else:
+            stack.pop()
     return items
 
-def get_plant_names(connection_string):
-    """Retrieve filtered list of plant names from 'shams_*' DBs, excluding invalid ones."""
+CHUNK_SIZE = 50000
+# Documents per server round-trip (the default is 101 for the first batch)
+CURSOR_BATCH_SIZE = 5000
+
+def _iter_chunks(cursor, chunk_size, transform=None, columns=None):
+    """Yield DataFrames of up to chunk_size documents from a Mongo cursor (without _id, renamed by columns)."""
+    def frame(batch):
+        if columns:
+            # Known, flat columns: from_records skips per-row key inference
+            return pd.DataFrame.from_records(batch, columns=list(columns)).rename(columns=columns)
+        return pd.DataFrame(batch).drop('_id', axis=1, errors='ignore')
+
+    batch = []
+    for doc in cursor:
+        batch.append(transform(doc) if transform else doc)
+        if len(batch) >= chunk_size:
+            yield frame(batch)
+            batch = []
+    if batch:
+        yield frame(batch)
+
+def _flat_projection(fields, extra=None):
+    """$project stage lifting each (possibly dotted) path in fields to a top-level field, plus the output column map.
+
+    $project output names cannot contain '.', so paths go to placeholders _f0, _f1, ... and are renamed after.
+    """
+    extra = extra or {}
+    placeholders = {f'_f{i}': field for i, field in enumerate(fields)}
+    stage = {'_id': 0, **extra, **{name: f'${field}' for name, field in placeholders.items()}}
+    return {'$project': stage}, {**{name: name for name in extra}, **placeholders}
+
+def _fetch_frame(chunks, level):
+    """Materialize a chunk iterator as one DataFrame, or an empty one (with the error logged) if the fetch fails."""
     try:
-        client = MongoClient(connection_string)
-        dbs = client.list_database_names()
-        valid_dbs = [db for db in dbs if db.startswith('shams_') and db not in ['shams_admin', 'shams_']]
-        plants = [db.replace('shams_', '') for db in valid_dbs]
-        client.close()
+        return _concat_chunks(chunks)
+    except Exception as e:
+        logging.error(f"Error fetching {level} data: {e}")
+        return pd.DataFrame()
+
+def _concat_chunks(chunks):
+    """Materialize a chunk iterator as a single DataFrame (empty if no chunks)."""
+    dataframes = list(chunks)
+    if len(dataframes) == 1:
+        # Already has a fresh RangeIndex; skip the full copy pd.concat would make
+        return dataframes[0]
+    if dataframes:
+        return pd.concat(dataframes, ignore_index=True)
+    return pd.DataFrame()
+
+def _tagged_pipeline(query, db_name):
+    """Match query and tag each document server-side with the plant name from its DB."""
+    return [{'$match': query}, {'$addFields': {'Plant': {'$literal': db_name.replace('shams_', '')}}}]
+
+def _valid_plant_names(dbs):
+    """Plant names from 'shams_*' DB names, excluding invalid ones."""
+    return [db.replace('shams_', '') for db in dbs if db.startswith('shams_') and db not in ['shams_admin', 'shams_']]
+
+def _db_list(plant_name):
+    """DB names for plant_name, or None when all plants are requested."""
+    if plant_name is None or (isinstance(plant_name, str) and plant_name.lower() == 'all'):
+        return None
+    if isinstance(plant_name, list):
+        return [f"shams_{p}" for p in plant_name]
+    return [f"shams_{plant_name}"]
+
+def _dbs_with_data(client, db_list, collection_name, query, max_workers=16):
+    """DBs in db_list whose collection_name has at least one document matching query, probed in parallel."""
+    def has_data(db_name):
+        try:
+            return client[db_name][collection_name].count_documents(query, limit=1) > 0
+        except Exception as e:
+            logging.error(f"Error probing {collection_name} of {db_name}: {e}")
+            return True  # Let the fetch itself surface the error
+    if len(db_list) < 2:
+        return db_list
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(db_list))) as executor:
+        keep = list(executor.map(has_data, db_list))
+    skipped = len(db_list) - sum(keep)
+    if skipped:
+        logging.info(f"Skipping {skipped} DBs with no {collection_name} data for query: {query}.")
+    return [db_name for db_name, k in zip(db_list, keep) if k]
+
+def date_bounds(start_date, end_date):
+    """(start, end-of-day) datetimes for 'YYYY-MM-DD' strings; datetimes are passed through as already-parsed bounds."""
+    if isinstance(start_date, str):
+        start_date = datetime.strptime(start_date, '%Y-%m-%d')
+    if isinstance(end_date, str):
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
+    return start_date, end_date
+
+def _plant_query(start_date, end_date):
+    """HR_PL_PRD query on timestamp, stored either as BSON Date or as a legacy '%Y-%m-%d %H:%M:%S' string."""
+    query = {}
+    if start_date and end_date:
+        start_dt, end_dt = date_bounds(start_date, end_date)
+        # BSON only compares within a type, so each branch is a plain (index-usable) range on timestamp
+        query['$or'] = [
+            {'timestamp': {'$gte': start_dt, '$lte': end_dt}},
+            {'timestamp': {
+                '$gte': start_dt.strftime('%Y-%m-%d %H:%M:%S'),
+                '$lte': end_dt.strftime('%Y-%m-%d %H:%M:%S')
+            }},
+        ]
+    return query
+
+def _string_query(start_date, end_date, inverter_sn=None, mppt_id=None, string_id=None):
+    """HR_IL_PRD_IN query on Day_Hour, sn, MPPT and Strings."""
+    query = {}
+    if start_date and end_date:
+        start_dt, end_dt = date_bounds(start_date, end_date)
+        query['Day_Hour'] = {
+            '$gte': start_dt.strftime('%Y-%m-%d %H'),
+            '$lte': end_dt.strftime('%Y-%m-%d %H')
+        }
+    if inverter_sn and inverter_sn.lower() != 'all':
+        if ',' in inverter_sn:
+            query['sn'] = {'$in': [sn.strip() for sn in inverter_sn.split(',')]}
+        else:
+            query['sn'] = inverter_sn
+    if mppt_id and mppt_id.lower() != 'all':
+        if ',' in mppt_id:
+            query['MPPT'] = {'$in': [mid.strip() for mid in mppt_id.split(',')]}
+        else:
+            query['MPPT'] = mppt_id
+    if string_id and string_id.lower() != 'all':
+        if ',' in string_id:
+            query['Strings'] = {'$in': [sid.strip() for sid in string_id.split(',')]}
+        else:
+            query['Strings'] = string_id
+    return query
+
+PLANT_NAMES_TTL = 60  # seconds
+_plant_names_cache = {}
+
+def _cached_plant_names(connection_string):
+    """Plant names cached for connection_string within PLANT_NAMES_TTL, else None."""
+    cached = _plant_names_cache.get(connection_string)
+    if cached and time.monotonic() - cached[0] < PLANT_NAMES_TTL:
+        return list(cached[1])
+    return None
+
+def _cache_plant_names(connection_string, plants):
+    """Remember plants for connection_string and return a copy."""
+    _plant_names_cache[connection_string] = (time.monotonic(), plants)
+    return list(plants)
+
+def get_plant_names(connection_string, client=None):
+    """Retrieve filtered list of plant names from 'shams_*' DBs, excluding invalid ones (cached for PLANT_NAMES_TTL)."""
+    plants = _cached_plant_names(connection_string)
+    if plants is not None:
         return plants
+    own_client = client is None
+    try:
+        if own_client:
+            client = MongoClient(connection_string)
+        plants = _valid_plant_names(client.list_database_names())
     except Exception as e:
         logging.error(f"Error retrieving plant names: {e}")
         return []
+    finally:
+        if own_client and client is not None:
+            client.close()
+    return _cache_plant_names(connection_string, plants)
 
-def fetch_plant_data(connection_string, plant_name=None, start_date=None, end_date=None):
+def _fetch_db(collection, pipeline, transform=None, chunk_size=CHUNK_SIZE):
+    """Run pipeline on one DB's collection as (DataFrames of chunk_size rows, leftover documents)."""
+    # Convert each full chunk as it arrives so the raw documents are freed instead of all held until the end
+    frames, batch = [], []
+    for doc in collection.aggregate(pipeline, batchSize=CURSOR_BATCH_SIZE):
+        batch.append(transform(doc) if transform else doc)
+        if len(batch) >= chunk_size:
+            frames.append(pd.DataFrame(batch))
+            batch = []
+    return frames, batch
+
+def _fetch_dbs(connection_string, db_list, collection_name, query, transform=None, chunk_size=CHUNK_SIZE, max_workers=16):
+    """Fetch Plant-tagged collection_name documents from every DB in db_list (all plants if None) as one DataFrame.
+
+    DBs are queried concurrently on a thread pool sharing one MongoClient; results are combined in DB order.
+    """
+    client = MongoClient(connection_string, maxPoolSize=32)
+    try:
+        if db_list is None:
+            db_list = _dbs_with_data(client, [f"shams_{p}" for p in get_plant_names(connection_string, client)],
+                                     collection_name, query)
+        if not db_list:
+            return pd.DataFrame()
+        # Mongo I/O releases the GIL, so the per-DB round-trips overlap
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(db_list))) as executor:
+            results = list(executor.map(
+                lambda db_name: _fetch_db(client[db_name][collection_name], _tagged_pipeline(query, db_name),
+                                          transform, chunk_size),
+                db_list))
+        # Leftover documents are pooled across DBs (in DB order), so small DBs share one DataFrame build
+        frames, pending = [], []
+        for db_name, (db_frames, leftover) in zip(db_list, results):
+            if not db_frames and not leftover:
+                logging.warning(f"No data in {collection_name} of {db_name} for query: {query}.")
+            if db_frames and pending:
+                frames.append(pd.DataFrame(pending))
+                pending = []
+            frames.extend(db_frames)
+            pending.extend(leftover)
+            if len(pending) >= chunk_size:
+                frames.append(pd.DataFrame(pending))
+                pending = []
+        if pending:
+            frames.append(pd.DataFrame(pending))
+    finally:
+        client.close()
+    return _concat_chunks(frames).drop('_id', axis=1, errors='ignore')
+
+def iter_plant_data(connection_string, plant_name=None, start_date=None, end_date=None, chunk_size=CHUNK_SIZE, fields=None, client=None):
     """
-    Fetch data for plant level.
+    Stream data for plant level as DataFrames of up to chunk_size rows.
     - Uses DBs: shams_{plant_name} (or all valid shams_* if 'all').
     - Collection: HR_PL_PRD
     - Query filter: timestamp if dates provided.
+    - fields: only these (dotted) paths plus Plant, flattened server-side; otherwise every field via flatten_json.
+    - client: existing MongoClient to use (left open); otherwise one is opened for this call.
+    - Fetch errors are raised, even after some chunks have been yielded.
     """
+    own_client = client is None
     try:
-        client = MongoClient(connection_string)
-        query = {}
-        if start_date and end_date:
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
-            query['timestamp'] = {
-                '$gte': start_dt.strftime('%Y-%m-%d %H:%M:%S'),
-                '$lte': end_dt.strftime('%Y-%m-%d %H:%M:%S')
-            }
-
-        dataframes = []
-
-        if plant_name is None or (isinstance(plant_name, str) and plant_name.lower() == 'all'):
-            db_list = [f"shams_{p}" for p in get_plant_names(connection_string)]
-        elif isinstance(plant_name, list):
-            db_list = [f"shams_{p}" for p in plant_name]
-        else:
-            db_list = [f"shams_{plant_name}"]
-
+        if own_client:
+            client = MongoClient(connection_string)
+        query = _plant_query(start_date, end_date)
+        db_list = _db_list(plant_name)
         collection_name = 'HR_PL_PRD'
+        if db_list is None:
+            # Sequential streaming below would pay one round-trip per empty DB, so probe them all at once first
+            db_list = _dbs_with_data(client, [f"shams_{p}" for p in get_plant_names(connection_string, client)],
+                                     collection_name, query)
 
         for db_name in db_list:
             db = client[db_name]
-            if collection_name not in db.list_collection_names():
-                logging.warning(f"Collection {collection_name} not found in {db_name}.")
-                continue
-            docs = list(db[collection_name].find(query))
-            if not docs:
+            if fields:
+                project, columns = _flat_projection(fields, {'Plant': {'$literal': db_name.replace('shams_', '')}})
+                chunks = _iter_chunks(db[collection_name].aggregate([{'$match': query}, project], batchSize=CURSOR_BATCH_SIZE), chunk_size, columns=columns)
+            else:
+                chunks = _iter_chunks(db[collection_name].aggregate(_tagged_pipeline(query, db_name), batchSize=CURSOR_BATCH_SIZE), chunk_size, flatten_json)
+            found = False
+            for df in chunks:
+                found = True
+                yield df
+            if not found:
                 logging.warning(f"No data in {collection_name} of {db_name}.")
-                continue
-            flattened = [flatten_json(doc) | {'Plant': db_name.replace('shams_', '')} for doc in docs]
-            df = pd.DataFrame(flattened).drop('_id', axis=1, errors='ignore')
-            dataframes.append(df)
+    finally:
+        if own_client and client is not None:
+            client.close()
 
-        client.close()
-        if dataframes:
-            return pd.concat(dataframes, ignore_index=True)
-        return pd.DataFrame()
+def fetch_plant_data(connection_string, plant_name=None, start_date=None, end_date=None):
+    """Fetch data for plant level as one DataFrame; DBs and filters as in iter_plant_data."""
+    try:
+        return _fetch_dbs(connection_string, _db_list(plant_name), 'HR_PL_PRD',
+                          _plant_query(start_date, end_date), flatten_json)
     except Exception as e:
         logging.error(f"Error fetching plant data: {e}")
         return pd.DataFrame()
 
-def fetch_inverter_data(connection_string, plant_name=None, inverter_sn=None, start_date=None, end_date=None):
+def iter_inverter_data(connection_string, plant_name=None, inverter_sn=None, start_date=None, end_date=None, chunk_size=CHUNK_SIZE, fields=None, client=None):
     """
-    Fetch data for inverter level.
+    Stream data for inverter level as DataFrames of up to chunk_size rows.
     - Uses DB: shams_admin
     - Collection: alerter2
     - Query filter: timestamp if dates provided, plus Plant and sn.
+    - fields: only these (dotted) paths, flattened server-side; otherwise every field via flatten_json.
+    - client: existing MongoClient to use (left open); otherwise one is opened for this call.
+    - Fetch errors are raised, even after some chunks have been yielded.
     """
+    own_client = client is None
     try:
-        client = MongoClient(connection_string)
+        if own_client:
+            client = MongoClient(connection_string)
         query = {}
         if start_date and end_date:
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
+            start_dt, end_dt = date_bounds(start_date, end_date)
             query['timestamp'] = {
                 '$gte': start_dt,
                 '$lte': end_dt
@@ -103,9 +315,6 @@ def fetch_inverter_data(connection_string, plant_name=None, inverter_sn=None, st
         db_name = 'shams_admin'
         db = client[db_name]
         collection_name = 'ALL_HR_ILMP_PRD_AVAIL'
-        if collection_name not in db.list_collection_names():
-            logging.warning(f"Collection {collection_name} not found in {db_name}.")
-            return pd.DataFrame()
 
         if plant_name:
             query['Plant'] = plant_name.replace('_', ' ')
@@ -115,33 +324,42 @@ def fetch_inverter_data(connection_string, plant_name=None, inverter_sn=None, st
             else:
                 query['sn'] = inverter_sn
 
-        docs = list(db[collection_name].find(query))
-        if not docs:
+        if fields:
+            project, columns = _flat_projection(fields)
+            chunks = _iter_chunks(db[collection_name].aggregate([{'$match': query}, project], batchSize=CURSOR_BATCH_SIZE), chunk_size, columns=columns)
+        else:
+            chunks = _iter_chunks(db[collection_name].find(query, batch_size=CURSOR_BATCH_SIZE), chunk_size, flatten_json)
+        found = False
+        for df in chunks:
+            found = True
+            yield df
+        if not found:
             logging.warning(f"No inverter data found for {plant_name} ({inverter_sn}).")
-            return pd.DataFrame()
+    finally:
+        if own_client and client is not None:
+            client.close()
 
-        flattened = [flatten_json(doc) for doc in docs]
-        df = pd.DataFrame(flattened).drop('_id', axis=1, errors='ignore')
-        client.close()
-        return df
-    except Exception as e:
-        logging.error(f"Error fetching inverter data: {e}")
-        return pd.DataFrame()
+def fetch_inverter_data(connection_string, plant_name=None, inverter_sn=None, start_date=None, end_date=None):
+    """Fetch data for inverter level as one DataFrame; see iter_inverter_data."""
+    return _fetch_frame(iter_inverter_data(connection_string, plant_name, inverter_sn, start_date, end_date), 'inverter')
 
-def fetch_mppt_data(connection_string, plant_name=None, inverter_sn=None, mppt_id=None, start_date=None, end_date=None):
+def iter_mppt_data(connection_string, plant_name=None, inverter_sn=None, mppt_id=None, start_date=None, end_date=None, chunk_size=CHUNK_SIZE, client=None):
     """
-    Fetch data for MPPT level.
+    Stream data for MPPT level as DataFrames of up to chunk_size rows.
     - Uses DB: shams_admin
     - Collection: alerter2
     - Unwinds mppts array to get per-MPPT data.
     - Query filter: timestamp, Plant, sn, and optionally mpptId.
+    - client: existing MongoClient to use (left open); otherwise one is opened for this call.
+    - Fetch errors are raised, even after some chunks have been yielded.
     """
+    own_client = client is None
     try:
-        client = MongoClient(connection_string)
+        if own_client:
+            client = MongoClient(connection_string)
         query = {}
         if start_date and end_date:
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
+            start_dt, end_dt = date_bounds(start_date, end_date)
             query['timestamp'] = {
                 '$gte': start_dt,
                 '$lte': end_dt
@@ -150,9 +368,6 @@ def fetch_mppt_data(connection_string, plant_name=None, inverter_sn=None, mppt_i
         db_name = 'shams_admin'
         db = client[db_name]
         collection_name = 'ALL_HR_ILMP_PRD_AVAIL'
-        if collection_name not in db.list_collection_names():
-            logging.warning(f"Collection {collection_name} not found in {db_name}.")
-            return pd.DataFrame()
 
         if plant_name:
             query['Plant'] = plant_name.replace('_', ' ')
@@ -184,82 +399,67 @@ def fetch_mppt_data(connection_string, plant_name=None, inverter_sn=None, mppt_i
             }}
         ]
 
-        docs = list(db[collection_name].aggregate(pipeline))
-        if not docs:
+        # Every projected field is a column, even when a chunk has no document carrying it
+        columns = {name: name for name in pipeline[-1]['$project'] if name != '_id'}
+        found = False
+        for df in _iter_chunks(db[collection_name].aggregate(pipeline, batchSize=CURSOR_BATCH_SIZE), chunk_size, columns=columns):
+            found = True
+            yield df
+        if not found:
             logging.warning(f"No MPPT data found for {plant_name} (sn: {inverter_sn}, mppt: {mppt_id}).")
-            return pd.DataFrame()
+    finally:
+        if own_client and client is not None:
+            client.close()
 
-        df = pd.DataFrame(docs)
-        client.close()
-        return df
-    except Exception as e:
-        logging.error(f"Error fetching MPPT data: {e}")
-        return pd.DataFrame()
+def fetch_mppt_data(connection_string, plant_name=None, inverter_sn=None, mppt_id=None, start_date=None, end_date=None):
+    """Fetch data for MPPT level as one DataFrame; see iter_mppt_data."""
+    return _fetch_frame(iter_mppt_data(connection_string, plant_name, inverter_sn, mppt_id, start_date, end_date), 'MPPT')
 
-def fetch_string_data(connection_string, plant_name=None, inverter_sn=None, mppt_id=None, string_id=None, start_date=None, end_date=None):
+def iter_string_data(connection_string, plant_name=None, inverter_sn=None, mppt_id=None, string_id=None, start_date=None, end_date=None, chunk_size=CHUNK_SIZE, fields=None, client=None):
     """
-    Fetch data for string level.
+    Stream data for string level as DataFrames of up to chunk_size rows.
     - Uses DBs: shams_{plant_name} (or all valid shams_* if 'all').
     - Collection: HR_IL_PRD_IN
     - Query filter: Day_Hour, Plant, sn, MPPT, and Strings if provided.
+    - fields: only these fields plus Plant are sent by the server; otherwise every field.
+    - client: existing MongoClient to use (left open); otherwise one is opened for this call.
+    - Fetch errors are raised, even after some chunks have been yielded.
     """
+    own_client = client is None
     try:
-        client = MongoClient(connection_string)
-        query = {}
-        if start_date and end_date:
-            start_dt = datetime.strptime(start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(end_date, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
-            query['Day_Hour'] = {
-                '$gte': start_dt.strftime('%Y-%m-%d %H'),
-                '$lte': end_dt.strftime('%Y-%m-%d %H')
-            }
-
-        dataframes = []
-
-        if plant_name is None or (isinstance(plant_name, str) and plant_name.lower() == 'all'):
-            db_list = [f"shams_{p}" for p in get_plant_names(connection_string)]
-        elif isinstance(plant_name, list):
-            db_list = [f"shams_{p}" for p in plant_name]
-        else:
-            db_list = [f"shams_{plant_name}"]
-
+        if own_client:
+            client = MongoClient(connection_string)
+        db_list = _db_list(plant_name)
         collection_name = 'HR_IL_PRD_IN'
+        # Same filter for every DB; aggregate never mutates it, so build it once and share it
+        query = _string_query(start_date, end_date, inverter_sn, mppt_id, string_id)
+        if db_list is None:
+            # Sequential streaming below would pay one round-trip per empty DB, so probe them all at once first
+            db_list = _dbs_with_data(client, [f"shams_{p}" for p in get_plant_names(connection_string, client)],
+                                     collection_name, query)
 
         for db_name in db_list:
             db = client[db_name]
-            if collection_name not in db.list_collection_names():
-                logging.warning(f"Collection {collection_name} not found in {db_name}.")
-                continue
-            plant_display = db_name.replace('shams_', '')
-            query_copy = query.copy()
-            if inverter_sn and inverter_sn.lower() != 'all':
-                if ',' in inverter_sn:
-                    query_copy['sn'] = {'$in': [sn.strip() for sn in inverter_sn.split(',')]}
-                else:
-                    query_copy['sn'] = inverter_sn
-            if mppt_id and mppt_id.lower() != 'all':
-                if ',' in mppt_id:
-                    query_copy['MPPT'] = {'$in': [mid.strip() for mid in mppt_id.split(',')]}
-                else:
-                    query_copy['MPPT'] = mppt_id
-            if string_id and string_id.lower() != 'all':
-                if ',' in string_id:
-                    query_copy['Strings'] = {'$in': [sid.strip() for sid in string_id.split(',')]}
-                else:
-                    query_copy['Strings'] = string_id
-
-            docs = list(db[collection_name].find(query_copy))
-            if not docs:
-                logging.warning(f"No data in {collection_name} of {db_name} for query: {query_copy}.")
-                continue
-            df = pd.DataFrame(docs).drop('_id', axis=1, errors='ignore')
-            df['Plant'] = plant_display
-            dataframes.append(df)
+            if fields:
+                project, columns = _flat_projection(fields, {'Plant': {'$literal': db_name.replace('shams_', '')}})
+                chunks = _iter_chunks(db[collection_name].aggregate([{'$match': query}, project], batchSize=CURSOR_BATCH_SIZE), chunk_size, columns=columns)
+            else:
+                chunks = _iter_chunks(db[collection_name].aggregate(_tagged_pipeline(query, db_name), batchSize=CURSOR_BATCH_SIZE), chunk_size)
+            found = False
+            for df in chunks:
+                found = True
+                yield df
+            if not found:
+                logging.warning(f"No data in {collection_name} of {db_name} for query: {query}.")
+    finally:
+        if own_client and client is not None:
+            client.close()
 
-        client.close()
-        if dataframes:
-            return pd.concat(dataframes, ignore_index=True)
-        return pd.DataFrame()
+def fetch_string_data(connection_string, plant_name=None, inverter_sn=None, mppt_id=None, string_id=None, start_date=None, end_date=None):
+    """Fetch data for string level as one DataFrame; DBs and filters as in iter_string_data."""
+    try:
+        return _fetch_dbs(connection_string, _db_list(plant_name), 'HR_IL_PRD_IN',
+                          _string_query(start_date, end_date, inverter_sn, mppt_id, string_id))
     except Exception as e:
         logging.error(f"Error fetching string data: {e}")
         return pd.DataFrame()